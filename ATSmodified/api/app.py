@@ -1,13 +1,30 @@
-from flask import Flask, request, jsonify
-import google.generativeai as genai
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 import fitz  # PyMuPDF - Use fitz instead of PyPDF2
+from concurrent.futures import ThreadPoolExecutor
+import io
 import logging
+import queue
 import json
 import time
 import os
 import re
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))  # Sibling modules on Vercel
+
+from cache import cache_from_env, make_cache_key, text_hash
+from corpus import corpus_from_env
+from metrics import PARSE_FAILURES, REQUEST_SECONDS, REQUESTS, render_metrics, server_timing_header, \
+    start_request_timings, timed
+from pipeline import StagePipeline
+from jobs import job_queue_from_env
+from gemini_client import GeminiClient, GeminiStreamError, GenaiBackend, estimate_tokens
+from stream_parser import IncrementalJSONObjectParser
+from text_compaction import compact_text, fit_to_budget, normalize_block, strip_repeated_margins
+from scoring import fast_score, match_percentage
 
 
 # Configure logging
@@ -19,59 +36,170 @@ load_dotenv()  # Still useful for local development
 app = Flask(__name__)
 CORS(app)  # Simplified CORS - allow all origins
 
-
-def extract_text_from_pdf(pdf_file_object: fitz.Document) -> str: #fitz.Document is more specific
-    """Extracts text from a PDF file object using PyMuPDF (fitz)."""
-    text = ""
+DEFAULT_MODEL = 'gemini-1.5-pro-latest'
+# Bump these whenever the corresponding prompt changes so stale cache entries are ignored.
+KEYWORDS_PROMPT_VERSION = "2"
+ANALYSIS_PROMPT_VERSION = "2"
+SINGLE_CALL_PROMPT_VERSION = "2"
+ANALYSIS_KEYS = ("JD Match", "MissingKeywords", "Profile Summary")  # Every analysis prompt asks for these
+
+# Prompt size limits; input tokens drive both Gemini latency and cost.
+PDF_MAX_PAGES = int(os.getenv("ATS_PDF_MAX_PAGES", "10"))
+RESUME_TOKEN_BUDGET = int(os.getenv("ATS_RESUME_TOKEN_BUDGET", "3000"))
+JD_TOKEN_BUDGET = int(os.getenv("ATS_JD_TOKEN_BUDGET", "1500"))
+
+result_cache = cache_from_env()  # Shared by keyword extraction and full analyses
+
+ANALYSIS_MODES = {'llm', 'fast', 'hybrid', 'single'}
+BATCH_MODES = ANALYSIS_MODES - {'single'}  # Batches already share one keyword extraction
+HYBRID_THRESHOLD = int(os.getenv("ATS_HYBRID_THRESHOLD", "40"))  # Min keyword coverage % sent on to Gemini
+
+resume_corpus = corpus_from_env()  # Stored resumes for re-screening against new openings
+SEARCH_MAX_TOP_K = 100
+
+# Request stages run on a shared pool so PDF parsing and keyword extraction overlap.
+stage_pool = ThreadPoolExecutor(max_workers=int(os.getenv("ATS_STAGE_WORKERS", "32")))
+STAGE_TIMEOUTS = {
+    "pdf": float(os.getenv("ATS_TIMEOUT_PDF", "15")),
+    "keywords": float(os.getenv("ATS_TIMEOUT_KEYWORDS", "45")),
+    "analysis": float(os.getenv("ATS_TIMEOUT_ANALYSIS", "60")),
+}
+
+BATCH_MAX_FILES = int(os.getenv("ATS_BATCH_MAX_FILES", "100"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("ATS_BATCH_MAX_CONCURRENCY", "8"))  # Concurrent Gemini calls per batch
+
+
+@app.before_request
+def start_request_metrics():
+    """Starts the request clock and per-stage timings."""
+    g.request_started = time.perf_counter()
+    g.stage_timings = start_request_timings()
+
+
+@app.after_request
+def finish_request_metrics(response):
+    """Records request metrics and reports stage timings in a Server-Timing header."""
+    elapsed = time.perf_counter() - g.get('request_started', time.perf_counter())
+    endpoint = request.endpoint or 'unknown'
+    REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    REQUEST_SECONDS.observe(elapsed, endpoint=endpoint)
+    # Streaming responses only include the stages finished before the first byte.
+    timings = {**g.get('stage_timings', {}), "total": elapsed}
+    response.headers['Server-Timing'] = server_timing_header(timings)
+    return response
+
+
+@timed("pdf")
+def extract_text_from_pdf(pdf_file_object: fitz.Document, stats: dict | None = None) -> str: #fitz.Document is more specific
+    """Extracts text from a PDF file object using PyMuPDF (fitz).
+
+    Reads text blocks from at most PDF_MAX_PAGES pages, drops repeated headers, footers
+    and page numbers, and normalizes bullets, hyphenation and whitespace. If `stats` is
+    given, it receives the token estimates before ("raw_tokens") and after ("tokens").
+    """
+    pages = []
+    raw_chars = 0
     try:
         # Open the PDF document from the file object's content
         doc = fitz.open(stream=pdf_file_object.read(), filetype="pdf")
-        for page in doc:
-            text += page.get_text()
+        for page in doc.pages(0, min(PDF_MAX_PAGES, doc.page_count)):
+            height = page.rect.height or 1
+            blocks = []
+            for x0, y0, x1, y1, block_text, _, block_type in page.get_text("blocks"):
+                if block_type != 0:  # Skip image blocks
+                    continue
+                raw_chars += len(block_text)
+                block_text = normalize_block(block_text)
+                if block_text:
+                    blocks.append((y0 / height, y1 / height, block_text))
+            pages.append(blocks)
         doc.close()
     except Exception as e:
         logging.error(f"Error extracting text with PyMuPDF: {e}")
         return "Error: Could not extract text from PDF."  # Consistent error handling
+
+    text = "\n\n".join("\n".join(blocks) for blocks in strip_repeated_margins(pages) if blocks)
+    if stats is not None:
+        stats["raw_tokens"] = max(1, raw_chars // 4)
+        stats["tokens"] = estimate_tokens(text)
     return text.strip()
 
 
-def call_gemini_api(prompt: str, model_name: str = 'gemini-1.5-pro-latest', max_retries: int = 3) -> str:
-    """Calls the Gemini API with retries."""
-    api_key = os.getenv("GOOGLE_PRO_API_KEY")
-    if not api_key:
+_gemini_client: GeminiClient | None = None
+_gemini_client_lock = threading.Lock()
+
+
+def get_gemini_client() -> GeminiClient | None:
+    """Returns the process-wide Gemini client, creating it on first use (None without an API key)."""
+    global _gemini_client
+    with _gemini_client_lock:
+        if _gemini_client is None:
+            api_key = os.getenv("GOOGLE_PRO_API_KEY")
+            if not api_key:
+                return None
+            _gemini_client = GeminiClient(
+                GenaiBackend(api_key),
+                requests_per_minute=float(os.getenv("ATS_GEMINI_RPM", "60")),
+                tokens_per_minute=float(os.getenv("ATS_GEMINI_TPM", "1000000")),
+                max_wait=float(os.getenv("ATS_GEMINI_MAX_WAIT", "10")),
+            )
+        return _gemini_client
+
+
+def set_gemini_client(client: GeminiClient | None) -> None:
+    """Replaces the shared Gemini client, e.g. with one wrapping FakeGeminiBackend for local runs."""
+    global _gemini_client
+    with _gemini_client_lock:
+        _gemini_client = client
+
+
+def call_gemini_api(prompt: str, model_name: str = DEFAULT_MODEL, max_retries: int = 3) -> str:
+    """Calls the Gemini API through the shared, rate-limited client."""
+    client = get_gemini_client()
+    if client is None:
         logging.error("GOOGLE_PRO_API_KEY not found")
         return "Error: GOOGLE_PRO_API_KEY not found"  # Consistent error
+    return client.generate(prompt, model_name, max_retries)
 
-    genai.configure(api_key=api_key)
-
-    for attempt in range(max_retries):
-        try:
-            model = genai.GenerativeModel(model_name)
-            response = model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            logging.error(f"Gemini API error (attempt {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  # Exponential backoff
-            else:
-                return f"Error: Gemini API error after multiple retries: {e}"
 
+@timed("keywords")
+def extract_job_keywords(job_description: str, model_name: str = DEFAULT_MODEL) -> str:
+    """Extracts key skills and requirements from the job description (cached per JD/model/prompt)."""
+    cache_key = make_cache_key("keywords", text_hash(job_description), model_name, KEYWORDS_PROMPT_VERSION)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-def extract_job_keywords(job_description: str) -> str:
-    """Extracts key skills and requirements from the job description."""
     prompt = f"""
     You are a highly skilled HR professional. Analyze the following job description and extract the key skills, technologies, and requirements.
     Return a comma-separated list of keywords and phrases. Be concise and specific. Focus on technical skills.
 
     Job Description:
-    {job_description}
+    {fit_to_budget(compact_text(job_description), JD_TOKEN_BUDGET)}
 
     Keywords:
     """
-    return call_gemini_api(prompt)
+    keywords = call_gemini_api(prompt, model_name)
+    if not keywords.startswith("Error:"):  # Never cache failures
+        result_cache.set(cache_key, keywords)
+    return keywords
 
 
-def create_analysis_prompt(resume_text: str, job_keywords: str) -> str:
+def create_analysis_prompt(resume_text: str, job_keywords: str | None = None, job_description: str | None = None) -> str:
+    """Builds the ATS prompt from the extracted job keywords.
+
+    Given `job_description` instead of keywords, the model is asked to pick out the
+    keywords itself, so one round-trip replaces extract_job_keywords plus the analysis.
+    """
+    resume_text = fit_to_budget(resume_text, RESUME_TOKEN_BUDGET)
+    if job_keywords is None:
+        job_description = fit_to_budget(compact_text(job_description), JD_TOKEN_BUDGET)
+        extra_rule = "\n    - First identify the key skills, technologies, and requirements in the job description (focus on technical skills), then evaluate the resume against them."
+        job_section = f"Job Description:\n    {job_description}"
+    else:
+        extra_rule = ""
+        job_section = f"Job Keywords:\n    {job_keywords}"
+
     prompt = f"""
     Act as an **advanced Applicant Tracking System (ATS)** specialized in **Software Engineering, Data Science, and Big Data Engineering**.
     Evaluate the resume against the provided job keywords, considering a **highly competitive job market**.
@@ -92,20 +220,28 @@ def create_analysis_prompt(resume_text: str, job_keywords: str) -> str:
     - **Ensure all percentage values contain `%` (e.g., `"85%"`).**
     - If the resume is very short or lacks relevant information, provide a "Profile Summary" indicating this.
     - Be critical and realistic in the "JD Match" percentage.
-    - Prioritize technical skills in "MissingKeywords".
+    - Prioritize technical skills in "MissingKeywords".{extra_rule}
 
     Resume Content:
     {resume_text}
 
-    Job Keywords:
-    {job_keywords}
+    {job_section}
     """
     return prompt
 
 
 def clean_and_parse_json(response_text: str) -> dict | None:
     """Cleans and parses the JSON response from Gemini. Handles potential errors."""
-    logging.info(f"Raw Response Text before JSON parsing: {response_text}")
+    with timed("json_parse"):
+        response_data = _clean_and_parse_json(response_text)
+    if response_data is None:
+        PARSE_FAILURES.inc()
+        logging.error(f"Unparseable Gemini response (first 500 chars): {response_text[:500]}")
+    return response_data
+
+
+def _clean_and_parse_json(response_text: str) -> dict | None:
+    logging.debug(f"Raw Response Text before JSON parsing: {response_text}")
 
     # 1. Remove any text BEFORE the first '{' and AFTER the last '}'
     cleaned_text = re.search(r'\{.*\}', response_text, re.DOTALL)
@@ -125,42 +261,488 @@ def clean_and_parse_json(response_text: str) -> dict | None:
         return json.loads(cleaned_text)
     except json.JSONDecodeError as e:
         logging.error(f"JSON Decode Error AFTER Cleaning: {e}")
-        logging.error(f"Problematic JSON string: {cleaned_text}")
+        logging.debug(f"Problematic JSON string: {cleaned_text}")
         return None  # Or handle as error
 
 
-@app.route('/api/analyze', methods=['POST'])
-def analyze():
-    """Analyzes a resume against a job description."""
-    logging.info("Received request to /api/analyze")  # Log request
+def is_complete_analysis(response_data) -> bool:
+    """True if a parsed reply has every field the analysis prompts ask for; only those are cached."""
+    return isinstance(response_data, dict) and all(key in response_data for key in ANALYSIS_KEYS)
+
+
+def analysis_cache_key(resume_text: str, job_keywords: str, model_name: str) -> str:
+    """Cache key for a full analysis: (resume text hash, keywords hash, model, prompt version)."""
+    return make_cache_key("analysis", text_hash(resume_text), text_hash(job_keywords),
+                          model_name, ANALYSIS_PROMPT_VERSION)
+
+
+@timed("analysis")
+def complete_analysis(build_prompt, cache_key: str, model_name: str) -> dict | str:
+    """Returns the cached analysis, or builds the prompt, calls Gemini and caches the parsed reply."""
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
+    response_text = call_gemini_api(build_prompt(), model_name)
+    if response_text.startswith("Error:"):  # Check for Gemini API error
+        return response_text
+
+    response_data = clean_and_parse_json(response_text)
+    if response_data is None:
+        return "Error: Failed to parse Gemini API response.  See server logs for details."
+
+    if is_complete_analysis(response_data):
+        result_cache.set(cache_key, response_data)
+    else:
+        logging.warning(f"Gemini response is missing analysis fields; not caching it: {sorted(response_data)}")
+    return response_data
+
+
+def run_analysis(resume_text: str, job_keywords: str, model_name: str = DEFAULT_MODEL) -> dict | str:
+    """Runs the ATS analysis prompt, returning the parsed result or an "Error: ..." string.
+
+    Successful results are cached; see analysis_cache_key.
+    """
+    return complete_analysis(lambda: create_analysis_prompt(resume_text, job_keywords),
+                             analysis_cache_key(resume_text, job_keywords, model_name), model_name)
+
+
+def run_single_call_analysis(resume_text: str, job_description: str, model_name: str = DEFAULT_MODEL) -> dict | str:
+    """Like run_analysis, but lets Gemini derive the keywords from the job description in the same call."""
+    cache_key = make_cache_key("single", text_hash(resume_text), text_hash(job_description),
+                               model_name, SINGLE_CALL_PROMPT_VERSION)
+    return complete_analysis(lambda: create_analysis_prompt(resume_text, job_description=job_description),
+                             cache_key, model_name)
+
+
+def analyze_resume(resume_text: str, job_keywords: str, mode: str = 'llm',
+                   threshold: int = HYBRID_THRESHOLD) -> tuple[dict | str, str]:
+    """Analyzes a resume in the given mode, returning (result or "Error: ...", mode actually used).
+
+    'fast' scores locally without calling Gemini; 'hybrid' only sends resumes whose
+    fast score reaches `threshold` percent on to the LLM analysis.
+    """
+    if mode == 'llm':
+        return run_analysis(resume_text, job_keywords), 'llm'
+
+    with timed("fast_score"):
+        fast_result = fast_score(resume_text, job_keywords)
+    if mode == 'fast' or match_percentage(fast_result) < threshold:
+        return fast_result, 'fast'
+    return run_analysis(resume_text, job_keywords), 'llm'
+
+
+def parse_mode_options(form, allowed_modes: set[str] = ANALYSIS_MODES) -> tuple[str, int] | str:
+    """Reads 'mode' and 'threshold' form fields, returning (mode, threshold) or an "Error: ..." string."""
+    mode = form.get('mode', 'llm').lower()
+    if mode not in allowed_modes:
+        return f"Error: Invalid mode. Choose one of: {', '.join(sorted(allowed_modes))}."
+    try:
+        threshold = int(form.get('threshold', HYBRID_THRESHOLD))
+    except ValueError:
+        return "Error: 'threshold' must be an integer percentage."
+    return mode, threshold
+
+
+def validate_analyze_request():
+    """Checks the 'resume' upload and 'job_description' field, returning an error response or None."""
     if 'resume' not in request.files or 'job_description' not in request.form:
         return jsonify({"error": "Invalid input: 'resume' file and 'job_description' text are required."}), 400
 
     resume_file_object = request.files['resume']
-    job_description = request.form['job_description']
-
     if not resume_file_object or resume_file_object.filename == '':
         return jsonify({"error": "No selected resume file"}), 400
     if not allowed_file(resume_file_object.filename):
         return jsonify({"error": "Invalid file type. Only PDF files are allowed."}), 400
+    return None
+
+
+def token_report(pdf_stats: dict, resume_text: str, job_description: str) -> str:
+    """Summarizes estimated tokens before compaction and as sent to Gemini, e.g. 'resume=5200->2100, jd=900->640'."""
+    resume_sent = estimate_tokens(fit_to_budget(resume_text, RESUME_TOKEN_BUDGET))
+    jd_sent = estimate_tokens(fit_to_budget(compact_text(job_description), JD_TOKEN_BUDGET))
+    return (f"resume={pdf_stats.get('raw_tokens', resume_sent)}->{resume_sent}, "
+            f"jd={estimate_tokens(job_description)}->{jd_sent}")
+
 
-    resume_text = extract_text_from_pdf(resume_file_object)
+def run_analyze_pipeline(pdf_data: bytes, job_description: str, mode: str = 'llm',
+                         threshold: int = HYBRID_THRESHOLD) -> tuple[dict | str, int, dict]:
+    """Runs the analyze stages, returning (result or "Error: ...", HTTP status, metadata).
+
+    Metadata holds the mode actually used and the token report. Shared by /api/analyze
+    and the background job workers.
+    """
+    # PDF parsing and keyword extraction only share the request, so they run side by side.
+    pipeline = StagePipeline(stage_pool, STAGE_TIMEOUTS)
+    pdf_stats = {}
+    pipeline.submit("pdf", extract_text_from_pdf, io.BytesIO(pdf_data), pdf_stats)
+    if mode != 'single':
+        pipeline.submit("keywords", extract_job_keywords, job_description)  # Cached per JD
+
+    resume_text = pipeline.result("pdf")
     if resume_text.startswith("Error:"):  # Check for PDF processing error
-        return jsonify({"error": resume_text}), 400
+        pipeline.cancel()
+        return resume_text, 504 if pipeline.timed_out else 400, {}
 
-    job_keywords = extract_job_keywords(job_description)  # Extract keywords
-    prompt = create_analysis_prompt(resume_text, job_keywords)
-    response_text = call_gemini_api(prompt)
+    if mode == 'single':
+        pipeline.submit("analysis", lambda: (run_single_call_analysis(resume_text, job_description), 'single'))
+    else:
+        job_keywords = pipeline.result("keywords")
+        if job_keywords.startswith("Error:"):
+            return job_keywords, 504 if pipeline.timed_out else 500, {}
+        pipeline.submit("analysis", analyze_resume, resume_text, job_keywords, mode, threshold)
 
-    if response_text.startswith("Error:"):  # Check for Gemini API error
-        return jsonify({"error": response_text}), 500
+    outcome = pipeline.result("analysis")
+    if isinstance(outcome, str):  # Stage timed out or crashed
+        return outcome, 504 if pipeline.timed_out else 500, {}
+    response_data, mode_used = outcome
+    if isinstance(response_data, str):  # "Error: ..." from Gemini or JSON parsing
+        return response_data, 500, {}
 
-    response_data = clean_and_parse_json(response_text)
+    tokens = token_report(pdf_stats, resume_text, job_description)
+    logging.info(f"Prompt tokens (raw -> sent): {tokens}")
+    return response_data, 200, {"mode": mode_used, "tokens": tokens}
+
+
+@app.route('/api/analyze', methods=['POST'])
+def analyze():
+    """Analyzes a resume against a job description."""
+    logging.info("Received request to /api/analyze")  # Log request
+
+    invalid = validate_analyze_request()
+    if invalid is not None:
+        return invalid
+    resume_file_object = request.files['resume']
+    job_description = request.form['job_description']
+
+    options = parse_mode_options(request.form)
+    if isinstance(options, str):
+        return jsonify({"error": options}), 400
+    mode, threshold = options
+
+    outcome, status, meta = run_analyze_pipeline(resume_file_object.read(), job_description, mode, threshold)
+    if isinstance(outcome, str):
+        return jsonify({"error": outcome}), status
+
+    response = jsonify(outcome)
+    response.headers['X-Analysis-Mode'] = meta['mode']  # Hybrid callers can tell whether Gemini ran
+    response.headers['X-Prompt-Tokens'] = meta['tokens']
+    return response
+
+
+def sse_event(event: str, data) -> str:
+    """Formats one Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_analysis(pdf_data: bytes, job_description: str, model_name: str = DEFAULT_MODEL):
+    """Yields SSE messages for a whole analysis request.
+
+    PDF parsing and keyword extraction run concurrently, each reported by a `stage`
+    event when it finishes. If the client disconnects, the generator is closed and
+    stages that have not started yet are cancelled.
+    """
+    pipeline = StagePipeline(stage_pool, STAGE_TIMEOUTS)
+    pipeline.submit("pdf", extract_text_from_pdf, io.BytesIO(pdf_data))
+    pipeline.submit("keywords", extract_job_keywords, job_description, model_name)
+    try:
+        resume_text = pipeline.result("pdf")
+        if resume_text.startswith("Error:"):
+            yield sse_event("error", {"error": resume_text})
+            return
+        yield sse_event("stage", {"name": "pdf", "seconds": round(pipeline.timings.get("pdf", 0.0), 3)})
+
+        job_keywords = pipeline.result("keywords")
+        if job_keywords.startswith("Error:"):
+            yield sse_event("error", {"error": job_keywords})
+            return
+        yield sse_event("stage", {"name": "keywords", "seconds": round(pipeline.timings.get("keywords", 0.0), 3)})
+
+        yield from stream_llm_analysis(resume_text, job_keywords, model_name)
+    finally:
+        pipeline.cancel()
+
+
+def stream_llm_analysis(resume_text: str, job_keywords: str, model_name: str = DEFAULT_MODEL):
+    """Yields SSE messages for the analysis call as Gemini streams it.
+
+    Emits a `field` event per completed top-level value ("JD Match", "Profile Summary"),
+    an `item` event per MissingKeywords entry, then `done` with the full result or
+    `error`. Cached analyses are replayed through the same events without calling Gemini.
+    """
+    cache_key = analysis_cache_key(resume_text, job_keywords, model_name)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        for name, value in cached.items():
+            if isinstance(value, list):
+                for item in value:
+                    yield sse_event("item", {"name": name, "value": item})
+            else:
+                yield sse_event("field", {"name": name, "value": value})
+        yield sse_event("done", cached)
+        return
+
+    client = get_gemini_client()
+    if client is None:
+        yield sse_event("error", {"error": "Error: GOOGLE_PRO_API_KEY not found"})
+        return
+
+    parser = IncrementalJSONObjectParser()
+    try:
+        for chunk in client.generate_stream(create_analysis_prompt(resume_text, job_keywords), model_name):
+            for kind, name, value in parser.feed(chunk):
+                yield sse_event(kind, {"name": name, "value": value})
+    except GeminiStreamError as e:
+        yield sse_event("error", {"error": str(e)})
+        return
+
+    # The incremental parser is strict about structure and returns None if any value failed
+    # to decode; fall back to the regex cleaner then.
+    response_data = parser.result() or clean_and_parse_json(parser.text)
     if response_data is None:
-        return jsonify({"error": "Failed to parse Gemini API response.  See server logs for details."}), 500
+        yield sse_event("error", {"error": "Error: Failed to parse Gemini API response.  See server logs for details."})
+        return
+    if is_complete_analysis(response_data):
+        result_cache.set(cache_key, response_data)
+    else:
+        logging.warning(f"Gemini response is missing analysis fields; not caching it: {sorted(response_data)}")
+    yield sse_event("done", response_data)
+
+
+@app.route('/api/analyze/stream', methods=['POST'])
+def analyze_stream():
+    """Analyzes a resume against a job description, streaming results as Server-Sent Events."""
+    logging.info("Received request to /api/analyze/stream")
+
+    invalid = validate_analyze_request()
+    if invalid is not None:
+        return invalid
+
+    # Read the upload now; the request stream is gone once the response starts.
+    response = Response(stream_analysis(request.files['resume'].read(), request.form['job_description']),
+                        mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Stop proxies from buffering the stream
+    return response
+
+
+def analyze_batch(resumes: list[tuple[str, bytes]], job_keywords: str, concurrency: int,
+                  mode: str = 'llm', threshold: int = HYBRID_THRESHOLD):
+    """Yields one NDJSON line per resume, in completion order.
 
-    return jsonify(response_data)
+    PDFs are parsed on their own pool; each parsed resume is handed to a second pool
+    bounded by `concurrency`, so at most that many Gemini calls are in flight at once.
+    Every failure is reported on its own line instead of failing the batch.
+    """
+    results = queue.Queue()
+    parse_pool = ThreadPoolExecutor(max_workers=min(len(resumes), os.cpu_count() or 4))
+    llm_pool = ThreadPoolExecutor(max_workers=concurrency)
+
+    def finish(index: int, filename: str, outcome: dict | str, mode_used: str | None = None) -> None:
+        if isinstance(outcome, str):
+            results.put({"index": index, "filename": filename, "error": outcome})
+        else:
+            results.put({"index": index, "filename": filename, "mode": mode_used, "result": outcome})
+
+    def analyze_one(index: int, filename: str, resume_text: str) -> None:
+        try:
+            finish(index, filename, *analyze_resume(resume_text, job_keywords, mode, threshold))
+        except Exception as e:
+            logging.error(f"Batch analysis failed for {filename}: {e}")
+            finish(index, filename, f"Error: {e}")
+
+    def parse_one(index: int, filename: str, data: bytes) -> None:
+        try:
+            if not allowed_file(filename):
+                finish(index, filename, "Error: Invalid file type. Only PDF files are allowed.")
+                return
+            resume_text = extract_text_from_pdf(io.BytesIO(data))
+            if resume_text.startswith("Error:"):
+                finish(index, filename, resume_text)
+                return
+            llm_pool.submit(analyze_one, index, filename, resume_text)  # Last step: analyze_one reports from here on
+        except Exception as e:
+            logging.error(f"Batch parsing failed for {filename}: {e}")
+            finish(index, filename, f"Error: {e}")
+
+    try:
+        for index, (filename, data) in enumerate(resumes):
+            parse_pool.submit(parse_one, index, filename, data)
+        for _ in resumes:
+            yield json.dumps(results.get()) + "\n"
+    finally:
+        # On client disconnect, drop work that has not started yet.
+        parse_pool.shutdown(wait=False, cancel_futures=True)
+        llm_pool.shutdown(wait=False, cancel_futures=True)
+
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch_endpoint():
+    """Analyzes many resumes against one job description, streaming NDJSON results."""
+    logging.info("Received request to /api/analyze/batch")
+
+    resume_files = request.files.getlist('resumes')
+    if not resume_files or 'job_description' not in request.form:
+        return jsonify({"error": "Invalid input: 'resumes' files and 'job_description' text are required."}), 400
+    if len(resume_files) > BATCH_MAX_FILES:
+        return jsonify({"error": f"Too many resumes: at most {BATCH_MAX_FILES} per batch."}), 400
+
+    try:
+        concurrency = int(request.form.get('concurrency', BATCH_MAX_CONCURRENCY))
+    except ValueError:
+        return jsonify({"error": "'concurrency' must be an integer."}), 400
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY))
+
+    options = parse_mode_options(request.form, BATCH_MODES)
+    if isinstance(options, str):
+        return jsonify({"error": options}), 400
+    mode, threshold = options
+
+    job_keywords = extract_job_keywords(request.form['job_description'])  # Once for the whole batch
+    if job_keywords.startswith("Error:"):
+        return jsonify({"error": job_keywords}), 500
+
+    # Read uploads now; the request stream is gone once the response starts.
+    resumes = [(f.filename or '', f.read()) for f in resume_files]
+    return Response(analyze_batch(resumes, job_keywords, concurrency, mode, threshold),
+                    mimetype='application/x-ndjson')
+
+
+def ingest_resume(filename: str, data: bytes) -> dict:
+    """Parses one uploaded PDF and adds it to the resume corpus."""
+    if not allowed_file(filename):
+        return {"filename": filename, "error": "Error: Invalid file type. Only PDF files are allowed."}
+    resume_text = extract_text_from_pdf(io.BytesIO(data))
+    if resume_text.startswith("Error:"):
+        return {"filename": filename, "error": resume_text}
+    resume_id, duplicate = resume_corpus.add(filename, data, resume_text)
+    return {"filename": filename, "id": resume_id, "duplicate": duplicate}
+
+
+@app.route('/api/resumes', methods=['POST'])
+def ingest_resumes():
+    """Stores uploaded resumes in the corpus; PDFs already stored are reported as duplicates."""
+    logging.info("Received request to /api/resumes")
+    if resume_corpus is None:
+        return jsonify({"error": "Resume corpus is unavailable. See server logs for details."}), 503
+
+    resume_files = request.files.getlist('resumes')
+    if not resume_files:
+        return jsonify({"error": "Invalid input: 'resumes' files are required."}), 400
+    if len(resume_files) > BATCH_MAX_FILES:
+        return jsonify({"error": f"Too many resumes: at most {BATCH_MAX_FILES} per request."}), 400
+
+    uploads = [(f.filename or '', f.read()) for f in resume_files]
+    with ThreadPoolExecutor(max_workers=min(len(uploads), os.cpu_count() or 4)) as pool:
+        results = list(pool.map(lambda upload: ingest_resume(*upload), uploads))
+    return jsonify({"results": results, "total_resumes": resume_corpus.count()})
+
+
+@app.route('/api/resumes/<int:resume_id>', methods=['DELETE'])
+def delete_resume(resume_id: int):
+    """Removes a stored resume and its index entries."""
+    if resume_corpus is None:
+        return jsonify({"error": "Resume corpus is unavailable. See server logs for details."}), 503
+    if not resume_corpus.delete(resume_id):
+        return jsonify({"error": "Resume not found."}), 404
+    return jsonify({"id": resume_id, "deleted": True, "total_resumes": resume_corpus.count()})
+
+
+@app.route('/api/resumes/search', methods=['POST'])
+def search_resumes():
+    """Ranks stored resumes against a job description and returns the top K."""
+    logging.info("Received request to /api/resumes/search")
+    if resume_corpus is None:
+        return jsonify({"error": "Resume corpus is unavailable. See server logs for details."}), 503
+
+    params = request.form if request.form else (request.get_json(silent=True) or {})  # Form or JSON body
+    job_description = params.get('job_description')
+    if not job_description:
+        return jsonify({"error": "Invalid input: 'job_description' text is required."}), 400
+    try:
+        top_k = int(params.get('top_k', 10))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'top_k' must be an integer."}), 400
+    top_k = max(1, min(top_k, SEARCH_MAX_TOP_K))
+
+    job_keywords = extract_job_keywords(job_description)
+    if job_keywords.startswith("Error:"):
+        return jsonify({"error": job_keywords}), 500
+
+    return jsonify({"results": resume_corpus.search(job_keywords, top_k), "total_resumes": resume_corpus.count()})
+
+
+@app.route('/api/gemini/stats', methods=['GET'])
+def gemini_stats():
+    """Reports Gemini client counters (coalescing, retries, throttling) and circuit breaker state."""
+    client = get_gemini_client()
+    if client is None:
+        return jsonify({"error": "GOOGLE_PRO_API_KEY not found"}), 503
+    return jsonify(client.stats())
+
+
+def run_analysis_job(payload: dict) -> tuple[dict | str, dict]:
+    """Job worker entry point: the /api/analyze pipeline without a request attached.
+
+    Returns the result with the mode used and the token report, which /api/analyze
+    sends as the X-Analysis-Mode and X-Prompt-Tokens headers.
+    """
+    outcome, _, meta = run_analyze_pipeline(**payload)
+    return outcome, meta
+
+
+job_queue = job_queue_from_env(run_analysis_job)  # Background analyses for POST /api/jobs
+
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queues an analysis and returns its job id at once; poll GET /api/jobs/<id> for the result."""
+    logging.info("Received request to /api/jobs")
+    if job_queue is None:
+        return jsonify({"error": "Job queue is unavailable. See server logs for details."}), 503
+
+    invalid = validate_analyze_request()
+    if invalid is not None:
+        return invalid
+    options = parse_mode_options(request.form)
+    if isinstance(options, str):
+        return jsonify({"error": options}), 400
+    mode, threshold = options
+
+    payload = {"pdf_data": request.files['resume'].read(), "job_description": request.form['job_description'],
+               "mode": mode, "threshold": threshold}
+    job_id = job_queue.submit(payload)
+    if job_id is None:
+        response = jsonify({"error": "Too many queued analyses. Please retry later."})
+        response.headers['Retry-After'] = str(job_queue.retry_after())
+        return response, 429
+
+    response = jsonify({"job_id": job_id, "status": "queued"})
+    response.headers['Location'] = f"/api/jobs/{job_id}"
+    return response, 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id: str):
+    """Returns a job's status and, once finished, its result or error."""
+    if job_queue is None:
+        return jsonify({"error": "Job queue is unavailable. See server logs for details."}), 503
+    job = job_queue.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found or expired."}), 404
+    return jsonify(job)
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Exposes stage latency histograms and retry/parse-failure counters in Prometheus text format."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Reports hit/miss/eviction counters for the result cache."""
+    return jsonify(result_cache.stats())
 
 ALLOWED_EXTENSIONS = {'pdf'}
 
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_text(text: str) -> str:
+    """Collapses whitespace so trivially different copies of a text hash the same."""
+    return re.sub(r'\s+', ' ', text or '').strip()
+
+
+def make_cache_key(*parts: str) -> str:
+    """Builds a stable SHA-256 key from the given parts (order matters)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x1f')  # Unit separator so ("ab", "c") != ("a", "bc")
+    return digest.hexdigest()
+
+
+def text_hash(text: str) -> str:
+    """Hashes a normalized copy of the text."""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """In-process LRU cache with TTL, optionally backed by an on-disk SQLite store.
+
+    Values must be JSON-serializable. Memory misses fall through to SQLite (when
+    configured) and are promoted back into memory on a disk hit.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 86400, db_path: str | None = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "writes": 0}
+        if db_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                    )
+            except sqlite3.Error as e:
+                logging.error(f"Could not open cache database {db_path}, using memory only: {e}")
+                self.db_path = None
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def get(self, key: str):
+        """Returns the cached value or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._stats["expirations"] += 1
+
+        disk_entry = self._disk_get(key, now)
+        with self._lock:
+            if disk_entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            expires_at, value = disk_entry
+            self._store(key, value, expires_at)  # Keep the stored expiry; promotion must not extend it
+        return value
+
+    def set(self, key: str, value) -> None:
+        """Stores a value in memory and, when configured, on disk."""
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._store(key, value, expires_at)
+            self._stats["writes"] += 1
+        self._disk_set(key, value, expires_at)
+
+    def _store(self, key: str, value, expires_at: float) -> None:
+        """Inserts into the LRU and evicts the oldest entries. Caller holds the lock."""
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _disk_get(self, key: str, now: float) -> tuple[float, object] | None:
+        """Returns (expires_at, value) for a live disk entry, or None."""
+        if not self.db_path:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                if row[1] <= now:
+                    conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    return None
+                return row[1], json.loads(row[0])
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            logging.error(f"Cache read error: {e}")
+            return None
+
+    def _disk_set(self, key: str, value, expires_at: float) -> None:
+        if not self.db_path:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), expires_at),
+                )
+        except (sqlite3.Error, TypeError) as e:
+            logging.error(f"Cache write error: {e}")
+
+    def clear(self) -> None:
+        """Drops every entry from memory and disk."""
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM cache")
+            except sqlite3.Error as e:
+                logging.error(f"Cache clear error: {e}")
+
+    def stats(self) -> dict:
+        """Returns a snapshot of the hit/miss/eviction counters."""
+        with self._lock:
+            return {**self._stats, "size": len(self._entries), "max_entries": self.max_entries,
+                    "persistent": bool(self.db_path)}
+
+
+def cache_from_env(prefix: str = "ATS_CACHE") -> ResultCache:
+    """Builds a ResultCache from <prefix>_MAX_ENTRIES, <prefix>_TTL and <prefix>_DB."""
+    return ResultCache(
+        max_entries=int(os.getenv(f"{prefix}_MAX_ENTRIES", "1024")),
+        ttl_seconds=float(os.getenv(f"{prefix}_TTL", "86400")),
+        db_path=os.getenv(f"{prefix}_DB") or None,
+    )
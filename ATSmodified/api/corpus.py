@@ -0,0 +1,186 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from scoring import compute_idf, cosine_scores, keyword_count_matrix, keyword_coverage, normalize_keyword, \
+    parse_keywords, phrase_counts, tokenize
+
+RERANK_FACTOR = 5  # Candidates re-scored exactly per requested result
+# Bump when scoring.tokenize changes; stored corpora are reindexed from their text on open.
+INDEX_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resumes (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL UNIQUE,
+    filename TEXT NOT NULL,
+    text TEXT NOT NULL,
+    n_tokens INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    resume_id INTEGER NOT NULL REFERENCES resumes(id) ON DELETE CASCADE,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, resume_id)
+) WITHOUT ROWID;
+"""
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 of the uploaded PDF bytes, used to de-duplicate ingests."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResumeCorpus:
+    """SQLite-backed resume store with an on-disk inverted index of normalized terms.
+
+    Each resume keeps its extracted text and content hash; the `postings` table maps
+    every normalized unigram to the resumes containing it, with term frequency.
+    Ranking reads only the postings for the query's terms, scores candidates with
+    TF-IDF cosine over the corpus, then re-scores the best ones exactly so
+    multi-word keywords must appear as phrases.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._write_lock = threading.Lock()  # SQLite allows one writer; serialize ingests
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            if conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+                self._reindex(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; avoids an fsync per ingest
+        return conn
+
+    def add(self, filename: str, data: bytes, text: str) -> tuple[int, bool]:
+        """Stores a resume and indexes its terms. Returns (resume id, was_duplicate)."""
+        digest = content_hash(data)
+        tokens = tokenize(text)
+        term_counts = Counter(tokens)
+        with self._write_lock, self._connect() as conn:
+            row = conn.execute("SELECT id FROM resumes WHERE content_hash = ?", (digest,)).fetchone()
+            if row is not None:
+                return row[0], True
+            cursor = conn.execute(
+                "INSERT INTO resumes (content_hash, filename, text, n_tokens, created_at) VALUES (?, ?, ?, ?, ?)",
+                (digest, filename, text, len(tokens), time.time()),
+            )
+            resume_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO postings (term, resume_id, tf) VALUES (?, ?, ?)",
+                ((term, resume_id, tf) for term, tf in term_counts.items()),
+            )
+        return resume_id, False
+
+    def _reindex(self, conn: sqlite3.Connection) -> None:
+        """Rebuilds every posting from the stored text, for postings written by an older tokenizer."""
+        started = time.perf_counter()
+        conn.execute("DELETE FROM postings")
+        n_resumes = 0
+        for resume_id, text in conn.execute("SELECT id, text FROM resumes").fetchall():
+            tokens = tokenize(text)
+            conn.execute("UPDATE resumes SET n_tokens = ? WHERE id = ?", (len(tokens), resume_id))
+            conn.executemany(
+                "INSERT INTO postings (term, resume_id, tf) VALUES (?, ?, ?)",
+                ((term, resume_id, tf) for term, tf in Counter(tokens).items()),
+            )
+            n_resumes += 1
+        conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        if n_resumes:
+            logging.info(f"Reindexed {n_resumes} stored resumes in {time.perf_counter() - started:.1f}s")
+
+    def count(self) -> int:
+        """Number of stored resumes."""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM resumes").fetchone()[0]
+
+    def delete(self, resume_id: int) -> bool:
+        """Removes a resume and its postings. Returns False if it did not exist."""
+        with self._write_lock, self._connect() as conn:
+            return conn.execute("DELETE FROM resumes WHERE id = ?", (resume_id,)).rowcount > 0
+
+    def search(self, job_keywords: str, top_k: int = 10) -> list[dict]:
+        """Ranks stored resumes against the keyword list, best first.
+
+        Each hit carries the resume id, filename, "JD Match" and "MissingKeywords",
+        mirroring the fast-mode /api/analyze response. Hits are ordered by keyword
+        coverage, ties broken by TF-IDF cosine similarity.
+        """
+        keywords = parse_keywords(job_keywords)
+        keyword_terms = [normalize_keyword(k).split() for k in keywords]
+        query_terms = sorted({t for terms in keyword_terms for t in terms})
+        if not query_terms:
+            return []
+
+        with self._connect() as conn:
+            n_documents = conn.execute("SELECT COUNT(*) FROM resumes").fetchone()[0]
+            placeholders = ",".join("?" * len(query_terms))
+            postings = conn.execute(
+                f"SELECT term, resume_id, tf FROM postings WHERE term IN ({placeholders})", query_terms
+            ).fetchall()
+        if not postings:
+            return []
+
+        # Candidate x term frequency matrix, straight from the inverted index.
+        candidate_ids = np.unique(np.fromiter((p[1] for p in postings), dtype=np.int64, count=len(postings)))
+        row_of = {int(rid): i for i, rid in enumerate(candidate_ids)}
+        col_of = {term: j for j, term in enumerate(query_terms)}
+        term_tf = np.zeros((len(candidate_ids), len(query_terms)))
+        for term, resume_id, tf in postings:
+            term_tf[row_of[resume_id], col_of[term]] = tf
+
+        # A phrase can occur at most as often as its rarest word: an upper bound
+        # that is exact for single-word keywords.
+        approx = np.stack([term_tf[:, [col_of[t] for t in terms]].min(axis=1) for terms in keyword_terms], axis=1)
+        idf = compute_idf((approx > 0).sum(axis=0), n_documents)
+        approx_order = np.lexsort((-cosine_scores(approx, idf), -keyword_coverage(approx, idf)))
+
+        n_rerank = min(len(candidate_ids), top_k * RERANK_FACTOR)
+        shortlist = approx_order[:n_rerank]
+        shortlist_ids = [int(candidate_ids[i]) for i in shortlist]
+
+        with self._connect() as conn:
+            placeholders = ",".join("?" * len(shortlist_ids))
+            rows = conn.execute(
+                f"SELECT id, filename, text FROM resumes WHERE id IN ({placeholders})", shortlist_ids
+            ).fetchall()
+        by_id = {row[0]: row for row in rows}
+        shortlist_ids = [rid for rid in shortlist_ids if rid in by_id]
+
+        exact = keyword_count_matrix([phrase_counts(by_id[rid][2]) for rid in shortlist_ids], keywords)
+        coverage = keyword_coverage(exact, idf)
+
+        hits = []
+        for i in np.lexsort((-cosine_scores(exact, idf), -coverage))[:top_k]:
+            if coverage[i] <= 0:
+                break
+            rid = shortlist_ids[i]
+            hits.append({
+                "id": rid,
+                "filename": by_id[rid][1],
+                "JD Match": f"{round(float(coverage[i]) * 100)}%",
+                "MissingKeywords": [k for k, c in zip(keywords, exact[i]) if c == 0],
+            })
+        return hits
+
+
+def corpus_from_env() -> ResumeCorpus | None:
+    """Opens the corpus at ATS_CORPUS_DB (default: a file in the temp dir), or None if unavailable."""
+    db_path = os.getenv("ATS_CORPUS_DB") or os.path.join(tempfile.gettempdir(), "ats_resume_corpus.db")
+    try:
+        return ResumeCorpus(db_path)
+    except sqlite3.Error as e:
+        logging.error(f"Could not open resume corpus at {db_path}: {e}")
+        return None
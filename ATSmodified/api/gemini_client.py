@@ -0,0 +1,358 @@
+import logging
+import random
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import Future
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+from metrics import GEMINI_EVENTS, GEMINI_RETRIES, timed
+
+# Provider errors worth retrying; everything else (bad request, auth, safety blocks) fails at once.
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    ConnectionError,
+    TimeoutError,
+)
+RATE_LIMIT_ERRORS = (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+
+
+class GeminiStreamError(Exception):
+    """Raised from GeminiClient.generate_stream; the message is an "Error: ..." string."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for rate budgeting."""
+    return max(1, len(text) // 4)
+
+
+class GenaiBackend:
+    """Talks to the real Gemini API. Configures the SDK once and reuses one model per name."""
+
+    def __init__(self, api_key: str):
+        genai.configure(api_key=api_key)
+        self._models: dict[str, genai.GenerativeModel] = {}
+        self._lock = threading.Lock()
+
+    def model(self, model_name: str) -> genai.GenerativeModel:
+        with self._lock:
+            if model_name not in self._models:
+                self._models[model_name] = genai.GenerativeModel(model_name)
+            return self._models[model_name]
+
+    def generate(self, model_name: str, prompt: str) -> str:
+        return self.model(model_name).generate_content(prompt).text
+
+    def generate_stream(self, model_name: str, prompt: str) -> Iterator[str]:
+        for chunk in self.model(model_name).generate_content(prompt, stream=True):
+            yield chunk.text
+
+
+class FakeGeminiBackend:
+    """Local stand-in for Gemini, for development, tests and benchmarks.
+
+    `responder(model_name, prompt)` builds the reply text; `latency` (seconds) and
+    `failure_rate` simulate a slow or flaky provider.
+    """
+
+    def __init__(self, responder=None, latency: float = 0.0, failure_rate: float = 0.0):
+        self.responder = responder or (lambda model_name, prompt: '{}')
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, model_name: str, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise google_exceptions.ServiceUnavailable("Fake Gemini backend failure")
+        return self.responder(model_name, prompt)
+
+    def generate_stream(self, model_name: str, prompt: str, chunk_size: int = 16) -> Iterator[str]:
+        """Yields the generated text in `chunk_size` pieces, spreading `latency` across them."""
+        with self._lock:
+            self.calls += 1
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise google_exceptions.ServiceUnavailable("Fake Gemini backend failure")
+        text = self.responder(model_name, prompt)
+        chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)] or [""]
+        for chunk in chunks:
+            if self.latency:
+                time.sleep(self.latency / len(chunks))
+            yield chunk
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self._tokens = rate_per_minute
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float, max_wait: float) -> float | None:
+        """Reserves `amount` tokens and returns how long to wait before using them.
+
+        Returns None, reserving nothing, if the wait would exceed `max_wait`.
+        """
+        amount = min(amount, self.capacity)  # A single oversized request must still be able to run
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, self._blocked_until - now, (amount - self._tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            self._tokens -= amount  # May go negative; later callers wait for the debt to refill
+            return wait
+
+    def refund(self, amount: float) -> None:
+        """Returns tokens from a reservation that was not used."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + min(amount, self.capacity))
+
+    def block_for(self, seconds: float) -> None:
+        """Stops handing out tokens for a while (e.g. after the provider returns 429)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = min(self._tokens, 0.0)
+
+
+class CircuitBreaker:
+    """Fails fast after `failure_threshold` consecutive failures, probing again after `reset_timeout`."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True if a call may go upstream. In half-open state only one probe is let through."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Gives up a half-open probe that ended without a verdict (e.g. the client went away)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logging.warning(f"Gemini circuit breaker opened after {self._failures} failures")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+class GeminiClient:
+    """Long-lived Gemini client shared by every request.
+
+    Adds, in front of the backend: request and token rate limits, single-flight
+    coalescing of identical in-flight prompts, a circuit breaker, and bounded
+    retries with jittered backoff for transient errors only. Like the rest of the
+    API, `generate` returns an "Error: ..." string instead of raising.
+    """
+
+    def __init__(self, backend, requests_per_minute: float = 60, tokens_per_minute: float = 1_000_000,
+                 max_wait: float = 10.0, max_retries: int = 3, backoff_base: float = 0.5,
+                 rate_limit_cooldown: float = 5.0, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.backend = backend
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.rate_limit_cooldown = rate_limit_cooldown
+        self._in_flight: dict[tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "upstream_calls": 0, "coalesced": 0, "retries": 0, "rate_limited": 0,
+                       "throttled": 0, "circuit_rejections": 0, "errors": 0}
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+        GEMINI_EVENTS.inc(amount, event=name)
+        if name == "retries":
+            GEMINI_RETRIES.inc(amount)
+
+    def _backoff(self, attempt: int) -> None:
+        self._count("retries")
+        with timed("gemini_backoff"):
+            time.sleep(self.backoff_base * (2 ** attempt) * random.uniform(0.5, 1.5))  # Jittered backoff
+
+    def generate(self, prompt: str, model_name: str, max_retries: int | None = None) -> str:
+        """Returns the model's text for `prompt`, sharing one upstream call among identical concurrent prompts."""
+        self._count("calls")
+        key = (model_name, prompt)
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+        if not leader:
+            self._count("coalesced")
+            return future.result()
+
+        try:
+            result = self._generate_with_retries(prompt, model_name,
+                                                 self.max_retries if max_retries is None else max_retries)
+        except Exception as e:  # Never leave followers hanging
+            logging.error(f"Unexpected Gemini client error: {e}")
+            result = f"Error: Unexpected Gemini client error: {e}"
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        future.set_result(result)
+        return result
+
+    def _acquire(self, prompt: str) -> bool:
+        """Waits for request and token budget. False if the wait would exceed max_wait."""
+        request_wait = self.request_bucket.reserve(1, self.max_wait)
+        if request_wait is None:
+            return False
+        token_wait = self.token_bucket.reserve(estimate_tokens(prompt), self.max_wait - request_wait)
+        if token_wait is None:
+            self.request_bucket.refund(1)
+            return False
+        wait = max(request_wait, token_wait)
+        if wait > 0:
+            with timed("gemini_throttle"):
+                time.sleep(wait)
+        return True
+
+    def _generate_with_retries(self, prompt: str, model_name: str, max_retries: int) -> str:
+        error = None
+        for attempt in range(max(1, max_retries)):
+            if not self.breaker.allow():
+                self._count("circuit_rejections")
+                return "Error: Gemini API is temporarily unavailable (circuit open). Please retry shortly."
+            if not self._acquire(prompt):
+                self.breaker.release_probe()  # No upstream call was made, so no verdict on the provider
+                self._count("throttled")
+                return "Error: Gemini API rate limit reached. Please retry shortly."
+
+            self._count("upstream_calls")
+            try:
+                with timed("gemini_call"):
+                    text = self.backend.generate(model_name, prompt)
+                self.breaker.record_success()
+                return text
+            except RETRYABLE_ERRORS as e:
+                error = e
+                self.breaker.record_failure()
+                if isinstance(e, RATE_LIMIT_ERRORS):
+                    # Everyone backs off together instead of each request retrying into the quota wall.
+                    self._count("rate_limited")
+                    self.request_bucket.block_for(self.rate_limit_cooldown)
+                logging.error(f"Gemini API error (attempt {attempt + 1}/{max_retries}): {e}")
+            except Exception as e:
+                # Bad requests and safety blocks say nothing about provider health; free the probe.
+                self.breaker.release_probe()
+                self._count("errors")
+                logging.error(f"Gemini API error (not retryable): {e}")
+                return f"Error: Gemini API error: {e}"
+
+            if attempt < max_retries - 1:
+                self._backoff(attempt)
+
+        self._count("errors")
+        return f"Error: Gemini API error after multiple retries: {error}"
+
+    def generate_stream(self, prompt: str, model_name: str, max_retries: int | None = None) -> Iterator[str]:
+        """Yields the model's text in chunks as Gemini produces them.
+
+        Goes through the same breaker and rate limits as `generate`, but is never
+        coalesced. Transient failures are retried only until the first chunk has been
+        yielded; after that, and for any final failure, GeminiStreamError is raised.
+        """
+        self._count("calls")
+        max_retries = max(1, self.max_retries if max_retries is None else max_retries)
+        for attempt in range(max_retries):
+            if not self.breaker.allow():
+                self._count("circuit_rejections")
+                raise GeminiStreamError("Error: Gemini API is temporarily unavailable (circuit open). Please retry shortly.")
+            if not self._acquire(prompt):
+                self.breaker.release_probe()
+                self._count("throttled")
+                raise GeminiStreamError("Error: Gemini API rate limit reached. Please retry shortly.")
+
+            self._count("upstream_calls")
+            started = False
+            settled = False
+            try:
+                for chunk in self.backend.generate_stream(model_name, prompt):
+                    if not started:
+                        started = True
+                        settled = True
+                        self.breaker.record_success()  # The provider is answering
+                    yield chunk
+                if not started:
+                    settled = True
+                    self.breaker.record_success()
+                return
+            except RETRYABLE_ERRORS as e:
+                settled = True
+                self.breaker.record_failure()
+                if isinstance(e, RATE_LIMIT_ERRORS):
+                    self._count("rate_limited")
+                    self.request_bucket.block_for(self.rate_limit_cooldown)
+                logging.error(f"Gemini streaming error (attempt {attempt + 1}/{max_retries}): {e}")
+                if started or attempt == max_retries - 1:
+                    self._count("errors")
+                    raise GeminiStreamError(f"Error: Gemini API error: {e}") from e
+            except Exception as e:
+                settled = True
+                self.breaker.release_probe()
+                self._count("errors")
+                logging.error(f"Gemini streaming error (not retryable): {e}")
+                raise GeminiStreamError(f"Error: Gemini API error: {e}") from e
+            finally:
+                if not settled:  # Consumer stopped before the first chunk
+                    self.breaker.release_probe()
+
+            self._backoff(attempt)
+
+    def stats(self) -> dict:
+        """Returns call, coalescing, retry and throttling counters plus the breaker state."""
+        with self._lock:
+            return {**self._stats, "circuit_state": self.breaker.state}
@@ -0,0 +1,210 @@
+import json
+import logging
+import math
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    meta TEXT,
+    owner TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at);
+"""
+ADDED_COLUMNS = {"meta": "TEXT", "owner": "TEXT"}  # Columns newer than the first release of the table
+
+
+class JobStore:
+    """SQLite-backed job status and results. Rows expire `ttl_seconds` after their last update.
+
+    The queue itself lives in process memory, so jobs still queued or running when a
+    process dies are orphaned. Each row records the `boot_id` of the process that
+    queued it; rows owned by another process and not updated for `stale_after`
+    seconds are marked failed when the store opens and on every new job, instead of
+    being polled until they expire. A process never fails its own rows this way.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float = 3600, stale_after: float = 900):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.stale_after = stale_after
+        self.boot_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in ADDED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+            self._fail_stale(conn, time.time())
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _fail_stale(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', error = ?, updated_at = ?, expires_at = ? "
+            "WHERE status IN ('queued', 'running') AND updated_at <= ? AND owner IS NOT ?",
+            ("Error: Job was lost (server restarted or stalled). Please resubmit.", now, now + self.ttl_seconds,
+             now - self.stale_after, self.boot_id),
+        )
+
+    def create(self, job_id: str) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE expires_at <= ?", (now,))  # Opportunistic cleanup
+            self._fail_stale(conn, now)
+            conn.execute(
+                "INSERT INTO jobs (id, status, owner, created_at, updated_at, expires_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, self.boot_id, now, now, now + self.ttl_seconds),
+            )
+
+    def claim(self, job_id: str) -> bool:
+        """Moves a queued job to running. False if it is no longer queued (e.g. already failed as lost)."""
+        now = time.time()
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ?, expires_at = ? WHERE id = ? AND status = 'queued'",
+                (now, now + self.ttl_seconds, job_id),
+            ).rowcount == 1
+
+    def update(self, job_id: str, status: str, result=None, error: str | None = None,
+               meta: dict | None = None) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, meta = ?, updated_at = ?, expires_at = ? "
+                "WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error,
+                 json.dumps(meta) if meta else None, now, now + self.ttl_seconds, job_id),
+            )
+
+    def delete(self, job_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def get(self, job_id: str) -> dict | None:
+        """Returns the job as a dict, or None if it does not exist or has expired.
+
+        Metadata recorded with the result (e.g. the analysis mode used) is merged in at the top level.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, status, result, error, created_at, updated_at, meta FROM jobs "
+                "WHERE id = ? AND expires_at > ?",
+                (job_id, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        job = {"job_id": row[0], "status": row[1], "created_at": row[4], "updated_at": row[5]}
+        if row[6] is not None:
+            job.update(json.loads(row[6]))
+        if row[2] is not None:
+            job["result"] = json.loads(row[2])
+        if row[3] is not None:
+            job["error"] = row[3]
+        return job
+
+
+class JobQueue:
+    """Bounded in-process queue drained by a pool of worker threads.
+
+    `handler(payload)` runs the job and returns (result or "Error: ..." string, metadata dict).
+    `submit` returns None instead of blocking when the queue is full, so callers can
+    shed load with a 429. Workers start on the first submit.
+    """
+
+    def __init__(self, store: JobStore, handler, max_size: int = 100, workers: int = 4):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self._queue: queue.Queue = queue.Queue(maxsize=max_size)
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._avg_seconds = 10.0  # Moving average job duration, seeds the Retry-After estimate
+
+    def _ensure_workers(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"ats-job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, payload) -> str | None:
+        """Queues a job and returns its id, or None if the queue is full."""
+        if self._queue.full():  # Shed load before touching the store
+            return None
+        self._ensure_workers()
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id)
+        try:
+            self._queue.put_nowait((job_id, payload))
+        except queue.Full:
+            self.store.delete(job_id)  # Lost the race for the last slot
+            return None
+        return job_id
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up."""
+        return max(1, math.ceil(self._queue.qsize() * self._avg_seconds / self.workers))
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _work(self) -> None:
+        while True:
+            job_id, payload = self._queue.get()
+            started = time.monotonic()
+            claimed = False
+            try:
+                claimed = self.store.claim(job_id)
+                if not claimed:
+                    logging.warning(f"Skipping job {job_id}: it is no longer queued")
+                    continue
+                result, meta = self.handler(payload)
+                if isinstance(result, str) and result.startswith("Error:"):
+                    self.store.update(job_id, "failed", error=result, meta=meta)
+                else:
+                    self.store.update(job_id, "done", result=result, meta=meta)
+            except Exception as e:
+                logging.error(f"Job {job_id} failed: {e}")
+                try:
+                    self.store.update(job_id, "failed", error=f"Error: {e}")
+                except sqlite3.Error as store_error:
+                    logging.error(f"Could not record failure of job {job_id}: {store_error}")
+            finally:
+                if claimed:  # Skipped jobs would drag the Retry-After estimate down
+                    elapsed = time.monotonic() - started
+                    with self._lock:
+                        self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+                self._queue.task_done()
+
+def job_queue_from_env(handler) -> JobQueue | None:
+    """Builds the job queue from environment variables.
+
+    Reads ATS_JOBS_DB, ATS_JOB_TTL, ATS_JOB_STALE_AFTER, ATS_JOB_QUEUE_SIZE and ATS_JOB_WORKERS.
+    """
+    db_path = os.getenv("ATS_JOBS_DB") or os.path.join(tempfile.gettempdir(), "ats_jobs.db")
+    try:
+        store = JobStore(db_path, ttl_seconds=float(os.getenv("ATS_JOB_TTL", "3600")),
+                         stale_after=float(os.getenv("ATS_JOB_STALE_AFTER", "900")))
+    except sqlite3.Error as e:
+        logging.error(f"Could not open job store at {db_path}: {e}")
+        return None
+    return JobQueue(store, handler, max_size=int(os.getenv("ATS_JOB_QUEUE_SIZE", "100")),
+                    workers=int(os.getenv("ATS_JOB_WORKERS", "4")))
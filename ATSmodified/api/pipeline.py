@@ -0,0 +1,76 @@
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+class StagePipeline:
+    """Runs the stages of one request on a shared thread pool.
+
+    Stages that do not depend on each other are submitted up front and overlap;
+    `result` waits for a stage with its own timeout. Stages follow the app's
+    convention of returning "Error: ..." strings, and so does the pipeline when a
+    stage times out or is cancelled. `cancel` stops stages that have not started
+    yet; a stage already talking to Gemini finishes in the background and its
+    result is discarded.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, timeouts: dict[str, float] | None = None,
+                 default_timeout: float = 60.0):
+        self.executor = executor
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self.timed_out: str | None = None  # Name of the first stage that timed out
+        self.timings: dict[str, float] = {}  # Seconds each finished stage ran for
+        self._cancelled = threading.Event()
+        self._futures: dict[str, Future] = {}
+        self._deadlines: dict[str, float] = {}
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def submit(self, name: str, fn, *args, **kwargs) -> None:
+        """Starts a stage; its timeout counts from now."""
+        self._deadlines[name] = time.monotonic() + self.timeouts.get(name, self.default_timeout)
+        # Run in a copy of the caller's context so per-request metrics follow the stage.
+        context = contextvars.copy_context()
+        self._futures[name] = self.executor.submit(context.run, self._run, name, fn, *args, **kwargs)
+
+    def _run(self, name: str, fn, *args, **kwargs):
+        if self._cancelled.is_set():
+            return f"Error: Stage '{name}' was cancelled."
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.timings[name] = time.perf_counter() - started
+
+    def result(self, name: str):
+        """Waits for a stage. On timeout, cancels the rest of the pipeline and returns an error string."""
+        future = self._futures[name]
+        try:
+            return future.result(timeout=max(0.0, self._deadlines[name] - time.monotonic()))
+        except FutureTimeoutError:
+            self.timed_out = self.timed_out or name
+            logging.error(f"Stage '{name}' timed out after {self.timeouts.get(name, self.default_timeout)}s")
+            self.cancel()
+            return f"Error: Stage '{name}' timed out."
+        except CancelledError:
+            return f"Error: Stage '{name}' was cancelled."
+        except Exception as e:
+            logging.error(f"Stage '{name}' failed: {e}")
+            self.cancel()
+            return f"Error: Stage '{name}' failed: {e}"
+
+    def cancel(self, name: str | None = None) -> None:
+        """Cancels one stage, or every stage that has not finished when no name is given."""
+        if name is not None:
+            future = self._futures.get(name)
+            if future is not None:
+                future.cancel()
+            return
+        self._cancelled.set()
+        for future in self._futures.values():
+            future.cancel()
@@ -0,0 +1,207 @@
+import re
+from collections import Counter
+
+import numpy as np
+
+
+# Alias -> canonical term. Keys and values are written in tokenized form (lowercase,
+# space-separated) so they can be matched against tokenized text directly.
+ALIASES = {
+    "k8s": "kubernetes",
+    "kube": "kubernetes",
+    "golang": "go",
+    "js": "javascript",
+    "ecmascript": "javascript",
+    "ts": "typescript",
+    "py": "python",
+    "python3": "python",
+    "node": "node.js",
+    "nodejs": "node.js",
+    "react.js": "react",
+    "reactjs": "react",
+    "vue.js": "vue",
+    "vuejs": "vue",
+    "postgres": "postgresql",
+    "psql": "postgresql",
+    "mongo": "mongodb",
+    "amazon web services": "aws",
+    "google cloud platform": "gcp",
+    "google cloud": "gcp",
+    "microsoft azure": "azure",
+    "ml": "machine learning",
+    "dl": "deep learning",
+    "ai": "artificial intelligence",
+    "nlp": "natural language processing",
+    "ci cd": "ci/cd",
+    "cicd": "ci/cd",
+    "tf": "tensorflow",
+    "sklearn": "scikit-learn",
+    "scikit learn": "scikit-learn",
+    "apache spark": "spark",
+    "pyspark": "spark",
+    "apache kafka": "kafka",
+    "apache airflow": "airflow",
+    "rest api": "rest",
+    "restful": "rest",
+    "restful api": "rest",
+    "rest apis": "rest",
+    "restful apis": "rest",
+    "ms sql": "sql server",
+    "mssql": "sql server",
+    "oop": "object oriented programming",
+}
+
+# Spellings kept as one token although they contain "/" or "-". Elsewhere those split
+# words, so "Python/Django", "AWS/GCP" and "k8s-based" match their separate keywords.
+PROTECTED_TERMS = {"ci/cd", "scikit-learn", "tcp/ip", "pl/sql", "t-sql", "ui/ux"} | {
+    word for term in (*ALIASES, *ALIASES.values()) for word in term.split() if "/" in word or "-" in word
+}
+
+MAX_PHRASE_TOKENS = 4  # Longest keyword phrase matched against resume text
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#./\-]*")
+_ALIAS_RE = re.compile(
+    r"(?<!\S)(" + "|".join(re.escape(a) for a in sorted(ALIASES, key=len, reverse=True)) + r")(?!\S)"
+)
+
+
+def _split_compound(token: str) -> list[str]:
+    """Splits a token on "/" and "-", keeping any PROTECTED_TERMS inside it whole."""
+    if token in PROTECTED_TERMS or ("/" not in token and "-" not in token):
+        return [token]
+    pieces = re.split(r"([/-])", token)
+    words, separators = pieces[0::2], pieces[1::2]
+    parts, i = [], 0
+    while i < len(words):
+        for j in range(len(words) - 1, i, -1):  # Longest protected run starting at word i
+            candidate = words[i] + "".join(separators[k] + words[k + 1] for k in range(i, j))
+            if candidate in PROTECTED_TERMS:
+                parts.append(candidate)
+                i = j + 1
+                break
+        else:
+            parts.append(words[i])
+            i += 1
+    return [p.rstrip(".") for p in parts if p.rstrip(".")]
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercases and splits text into terms, keeping tech spellings like c++, c#, node.js and ci/cd."""
+    tokens = [part for t in _TOKEN_RE.findall((text or "").lower()) for part in _split_compound(t.rstrip(".-/"))]
+    return _ALIAS_RE.sub(lambda m: ALIASES[m.group(1)], " ".join(tokens)).split()
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Canonical, space-joined form of a keyword phrase (aliases resolved)."""
+    return " ".join(tokenize(re.sub(r"\(.*?\)", " ", keyword)))
+
+
+def parse_keywords(job_keywords: str) -> list[str]:
+    """Splits the comma-separated output of extract_job_keywords into unique keywords.
+
+    Keeps the first spelling seen for each canonical form, so reported missing
+    keywords read the way the job description wrote them.
+    """
+    keywords, seen = [], set()
+    for raw in re.split(r"[,\n;]", job_keywords or ""):
+        keyword = raw.strip().strip("*-•").strip()
+        canonical = normalize_keyword(keyword)
+        if not canonical or canonical in seen or len(canonical.split()) > MAX_PHRASE_TOKENS:
+            continue
+        seen.add(canonical)
+        keywords.append(keyword)
+    return keywords
+
+
+def phrase_counts(text: str) -> Counter:
+    """Counts every 1..MAX_PHRASE_TOKENS-gram of the tokenized text."""
+    tokens = tokenize(text)
+    counts = Counter()
+    for n in range(1, MAX_PHRASE_TOKENS + 1):
+        counts.update(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+    return counts
+
+
+def keyword_count_matrix(resume_counts: list[Counter], keywords: list[str]) -> np.ndarray:
+    """Builds an (n_resumes, n_keywords) matrix of raw keyword occurrence counts."""
+    canonical = [normalize_keyword(k) for k in keywords]
+    matrix = np.zeros((len(resume_counts), len(canonical)), dtype=np.float64)
+    for row, counts in enumerate(resume_counts):
+        matrix[row] = [counts.get(term, 0) for term in canonical]
+    return matrix
+
+
+def compute_idf(document_frequency: np.ndarray, n_documents: int) -> np.ndarray:
+    """Smoothed inverse document frequency, as in scikit-learn's TfidfVectorizer."""
+    return np.log((1 + n_documents) / (1 + document_frequency)) + 1
+
+
+def cosine_scores(counts: np.ndarray, idf: np.ndarray | None = None) -> np.ndarray:
+    """Scores each resume row against the job-keyword query with TF-IDF cosine similarity.
+
+    Term frequency is log-scaled (1 + ln(count)). The query holds every keyword once,
+    so a resume mentioning all keywords in equal measure scores 1.0. Used to rank
+    the resume corpus, where it breaks ties between equal keyword coverage.
+    """
+    if counts.shape[1] == 0:
+        return np.zeros(counts.shape[0])
+    if idf is None:
+        idf = np.ones(counts.shape[1])
+    tf = np.where(counts > 0, 1 + np.log(np.maximum(counts, 1)), 0.0)
+    resume_vectors = tf * idf
+    query = idf
+    norms = np.linalg.norm(resume_vectors, axis=1) * np.linalg.norm(query)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(norms > 0, resume_vectors @ query / norms, 0.0)
+    return scores
+
+
+def keyword_coverage(counts: np.ndarray, idf: np.ndarray | None = None) -> np.ndarray:
+    """Share of the job keywords each resume row mentions, each keyword weighted by `idf`.
+
+    This is what "JD Match" reports: a resume covering 3 of 5 equally weighted keywords
+    scores 0.6, however often it repeats them. Cosine similarity instead grows with the
+    square root of coverage, so it suits ranking, not a pass/fail threshold.
+    """
+    if counts.shape[1] == 0:
+        return np.zeros(counts.shape[0])
+    if idf is None:
+        idf = np.ones(counts.shape[1])
+    return (counts > 0) @ idf / idf.sum()
+
+
+def score_resumes(resume_texts: list[str], job_keywords: str) -> list[dict]:
+    """Scores resumes against the keyword list, returning the /api/analyze JSON shape for each.
+
+    "JD Match" is plain keyword coverage, every keyword weighing the same, so a
+    resume's score does not depend on which other resumes are scored with it.
+    IDF weighting and cosine similarity are only used to rank the stored corpus.
+    """
+    keywords = parse_keywords(job_keywords)
+    counts = keyword_count_matrix([phrase_counts(t) for t in resume_texts], keywords)
+    scores = keyword_coverage(counts)
+
+    results = []
+    for row, score in zip(counts, scores):
+        missing = [k for k, c in zip(keywords, row) if c == 0]
+        found = len(keywords) - len(missing)
+        results.append({
+            "JD Match": f"{round(float(score) * 100)}%",
+            "MissingKeywords": missing,
+            "Profile Summary": (
+                f"Fast keyword screen: the resume mentions {found} of {len(keywords)} job keywords. "
+                "This score comes from local keyword matching, not an AI review."
+            ),
+        })
+    return results
+
+
+def fast_score(resume_text: str, job_keywords: str) -> dict:
+    """Scores a single resume; see score_resumes."""
+    return score_resumes([resume_text], job_keywords)[0]
+
+
+def match_percentage(result: dict) -> int:
+    """Reads the integer percentage back out of a "JD Match" value like "85%"."""
+    match = re.search(r"\d+", str(result.get("JD Match", "")))
+    return int(match.group(0)) if match else 0
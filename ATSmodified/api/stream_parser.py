@@ -0,0 +1,127 @@
+import json
+import logging
+
+_INVALID = object()  # Marks a key or value that was not valid JSON
+
+
+class IncrementalJSONObjectParser:
+    """Parses one top-level JSON object from text that arrives in chunks.
+
+    Anything before the first '{' or after the matching '}' (markdown fences, chatter)
+    is ignored. `feed` returns events as soon as they are complete:
+
+    * ("field", key, value) when a top-level value has been read in full;
+    * ("item", key, value) for each element of a top-level array, before the array ends.
+
+    Arrays are reported only through their items; `result()` holds the full object,
+    or None if any key or value failed to decode.
+    """
+
+    def __init__(self):
+        self.done = False
+        self.failed = False  # A key or value was not valid JSON; result() will be None
+        self._buf = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+        self._in_array = False
+        self._item_start = None
+        self._result = {}
+
+    def feed(self, chunk: str) -> list[tuple[str, str, object]]:
+        """Consumes the next chunk and returns the events it completed."""
+        events = []
+        if self.done:
+            return events
+        self._buf += chunk
+        buf = self._buf
+        while self._pos < len(buf) and not self.done:
+            ch = buf[self._pos]
+            if self._depth == 0:
+                if ch == '{':
+                    self._depth = 1
+                    self._expect_key = True
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        key = self._decode(buf[self._key_start:self._pos + 1])
+                        self._key = None if key is _INVALID else key
+                        self._key_start = None
+            elif ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._key_start = self._pos
+                    self._expect_key = False
+            elif ch == ':' and self._depth == 1:
+                self._value_start = self._pos + 1
+            elif ch in '[{':
+                self._depth += 1
+                if ch == '[' and self._depth == 2 and self._key is not None:
+                    self._in_array = True
+                    self._item_start = self._pos + 1
+                    self._result[self._key] = []
+            elif ch in ']}':
+                if self._in_array and self._depth == 2:
+                    self._emit_item(buf[self._item_start:self._pos], events)
+                    self._in_array = False
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit_field(buf[self._value_start:self._pos], events)
+                    self.done = True
+            elif ch == ',':
+                if self._in_array and self._depth == 2:
+                    self._emit_item(buf[self._item_start:self._pos], events)
+                    self._item_start = self._pos + 1
+                elif self._depth == 1:
+                    self._emit_field(buf[self._value_start:self._pos], events)
+                    self._expect_key = True
+            self._pos += 1
+        return events
+
+    def _decode(self, text: str):
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as e:
+            logging.error(f"Streaming JSON Decode Error: {e}")
+            self.failed = True
+            return _INVALID
+
+    def _emit_item(self, text: str, events: list) -> None:
+        text = text.strip()
+        if not text:
+            return
+        value = self._decode(text)
+        if value is not _INVALID:
+            self._result[self._key].append(value)
+            events.append(("item", self._key, value))
+
+    def _emit_field(self, text: str, events: list) -> None:
+        key, self._key, self._value_start = self._key, None, None
+        if key is None or isinstance(self._result.get(key), list):
+            return  # Arrays were already reported item by item
+        text = (text or "").strip()
+        if not text:
+            return
+        value = self._decode(text)
+        if value is not _INVALID:
+            self._result[key] = value
+            events.append(("field", key, value))
+
+    def result(self) -> dict | None:
+        """The parsed object once the closing '}' has been seen, else None (also when any part failed)."""
+        return self._result if self.done and not self.failed else None
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far, for falling back to the non-streaming cleaner."""
+        return self._buf
@@ -0,0 +1,130 @@
+import re
+from collections import Counter
+
+from gemini_client import estimate_tokens
+
+EDGE_FRACTION = 0.12  # Top/bottom share of a page where headers and footers live
+REPEAT_FRACTION = 0.6  # A margin block on at least this share of pages is boilerplate
+
+BULLET_RE = re.compile(r"^[ \t]*[•●▪■◦○◆◇►▸‣∙·⁃–—*]+[ \t]*", re.MULTILINE)
+HYPHEN_BREAK_RE = re.compile(r"(\w)-\n(\w)")
+PAGE_NUMBER_RE = re.compile(r"^\s*(page\s*)?\d+(\s*(of|/)\s*\d+)?\s*$", re.IGNORECASE)
+INVISIBLE_RE = re.compile(r"[​‌‍⁠﻿­]")
+
+# Resume section headings, lowest value first; trimmed in this order when over budget.
+# "Languages" and "Certifications" are left out on purpose: on engineering resumes they
+# list programming languages and certifications such as AWS, which are keywords we match.
+LOW_VALUE_SECTIONS = [
+    "references", "declaration", "hobbies", "interests", "personal details", "personal information",
+    "volunteering", "volunteer experience", "awards", "publications", "objective",
+    "career objective", "courses", "achievements",
+]
+_HEADING_RE = re.compile(
+    r"^\s*(" + "|".join(re.escape(h) for h in sorted(LOW_VALUE_SECTIONS, key=len, reverse=True)) + r")\s*:?\s*$",
+    re.IGNORECASE,
+)
+MAIN_SECTIONS = [
+    "summary", "profile", "professional summary", "experience", "work experience", "professional experience",
+    "employment", "employment history", "education", "skills", "technical skills", "projects",
+]
+# Any heading-like line ends a low-value section: a known main heading, a short all-caps
+# line, or a short Title Case line such as "Research Experience" or "Open Source Work".
+_MAIN_HEADING_RE = re.compile(
+    r"^\s*(" + "|".join(re.escape(h) for h in MAIN_SECTIONS) + r")\s*:?\s*$", re.IGNORECASE
+)
+_CAPS_HEADING_RE = re.compile(r"^\s*[A-Z][A-Z &/]{2,40}:?\s*$")
+_TITLE_HEADING_RE = re.compile(
+    r"^\s*[A-Z][A-Za-z&/+'-]*(\s+([A-Z][A-Za-z&/+'-]*|and|of|&|in|for|the|to)){0,4}\s*:?\s*$"
+)
+
+
+def is_heading(line: str) -> bool:
+    """Heuristic: does this line look like a section heading?"""
+    return len(line.strip()) <= 40 and bool(
+        _MAIN_HEADING_RE.match(line) or _CAPS_HEADING_RE.match(line) or _TITLE_HEADING_RE.match(line)
+    )
+
+
+def normalize_block(text: str) -> str:
+    """Rejoins hyphenated line breaks, turns bullet glyphs into '- ' and collapses whitespace."""
+    text = INVISIBLE_RE.sub("", text).replace(" ", " ")
+    text = HYPHEN_BREAK_RE.sub(r"\1\2", text)
+    text = BULLET_RE.sub("- ", text)
+    text = re.sub(r"[ \t]+", " ", text)
+    lines = [line.strip() for line in text.split("\n")]
+    return "\n".join(line for line in lines if line)
+
+
+def compact_text(text: str) -> str:
+    """Whitespace and glyph cleanup for free text such as a pasted job description."""
+    return re.sub(r"\n{3,}", "\n\n", normalize_block(text))
+
+
+def _boilerplate_key(text: str) -> str:
+    """Compares margin blocks while ignoring case, spacing and page numbers."""
+    return re.sub(r"\s+", " ", re.sub(r"\d+", "#", text.lower())).strip()
+
+
+def strip_repeated_margins(pages: list[list[tuple[float, float, str]]]) -> list[list[str]]:
+    """Drops page numbers and the repeats of header/footer blocks seen on earlier pages.
+
+    Each page is a list of (relative y0, relative y1, text) blocks. Only blocks in the
+    top or bottom EDGE_FRACTION of a page are candidates, so repeated body text stays.
+    The first occurrence of a repeated block is kept, since resume headers usually
+    carry the candidate's name and contact details.
+    """
+    def in_margin(y0: float, y1: float) -> bool:
+        return y1 <= EDGE_FRACTION or y0 >= 1 - EDGE_FRACTION
+
+    counts = Counter()
+    for page in pages:
+        counts.update({_boilerplate_key(text) for y0, y1, text in page if in_margin(y0, y1)})
+    min_repeats = max(2, round(len(pages) * REPEAT_FRACTION))
+
+    kept, seen = [], set()
+    for page in pages:
+        page_text = []
+        for y0, y1, text in page:
+            if in_margin(y0, y1):
+                if PAGE_NUMBER_RE.match(text):
+                    continue
+                key = _boilerplate_key(text)
+                if len(pages) > 1 and counts[key] >= min_repeats:
+                    if key in seen:
+                        continue
+                    seen.add(key)
+            page_text.append(text)
+        kept.append(page_text)
+    return kept
+
+
+def split_sections(text: str) -> list[tuple[str | None, str]]:
+    """Splits resume text into (low-value heading or None, section text) chunks."""
+    sections, heading, lines = [], None, []
+    for line in text.split("\n"):
+        match = _HEADING_RE.match(line)
+        if match or (heading is not None and is_heading(line)):
+            if lines:
+                sections.append((heading, "\n".join(lines)))
+            heading, lines = (match.group(1).lower() if match else None), []
+        lines.append(line)
+    if lines:
+        sections.append((heading, "\n".join(lines)))
+    return sections
+
+
+def fit_to_budget(text: str, max_tokens: int) -> str:
+    """Trims text to roughly `max_tokens`, dropping low-value sections before cutting the tail."""
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text
+
+    sections = split_sections(text)
+    for heading in LOW_VALUE_SECTIONS:
+        sections = [s for s in sections if s[0] != heading]
+        text = "\n".join(body for _, body in sections)
+        if estimate_tokens(text) <= max_tokens:
+            return text
+
+    cut = text[:max_tokens * 4]
+    cut = cut[:cut.rfind("\n")] if "\n" in cut else cut
+    return cut + "\n[truncated]"
@@ -0,0 +1,174 @@
+"""Replays resumes and job descriptions against the API with a stubbed Gemini backend.
+
+Requests go through the Flask test client in-process, so the numbers cover PDF parsing,
+keyword extraction, prompting, retries and JSON cleanup without network noise. Gemini is
+replaced by FakeGeminiBackend with a configurable latency, so runs are reproducible.
+
+    python benchmarks/run_benchmark.py --requests 200 --concurrency 8 --latency 0.8
+    python benchmarks/run_benchmark.py --corpus path/to/samples --json > bench_output.json
+
+A corpus directory holds *.pdf resumes and *.txt job descriptions. Without one, a
+synthetic corpus is generated from --seed.
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import fitz  # PyMuPDF
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+
+import app as ats_app  # noqa: E402
+from cache import ResultCache  # noqa: E402
+from gemini_client import FakeGeminiBackend, GeminiClient  # noqa: E402
+
+SKILLS = ["Python", "Java", "Go", "Kubernetes", "AWS", "GCP", "Docker", "SQL", "PostgreSQL", "Spark", "Kafka",
+          "Airflow", "React", "TypeScript", "Machine Learning", "Terraform", "Linux", "Flask", "REST APIs"]
+FILLER = ("Led a cross-functional team delivering features on schedule. Improved reliability and "
+          "reduced costs through automation. Collaborated with stakeholders on requirements.").split()
+
+
+def synthetic_corpus(n_resumes: int, n_jds: int, seed: int) -> tuple[list[tuple[str, bytes]], list[str]]:
+    """Builds reproducible multi-page resume PDFs and job descriptions."""
+    rng = random.Random(seed)
+    resumes = []
+    for i in range(n_resumes):
+        doc = fitz.open()
+        for page_no in range(rng.randint(1, 4)):
+            page = doc.new_page()
+            page.insert_text((72, 40), f"Candidate {i} - Curriculum Vitae")
+            page.insert_text((280, 810), f"Page {page_no + 1}")
+            y = 90
+            for _ in range(rng.randint(20, 45)):
+                words = rng.sample(FILLER, 8) + rng.sample(SKILLS, 2)
+                page.insert_text((72, y), "• " + " ".join(words), fontsize=9)
+                y += 15
+        resumes.append((f"resume_{i}.pdf", doc.tobytes()))
+        doc.close()
+    jds = [f"We are hiring an engineer with {', '.join(rng.sample(SKILLS, 6))}. " + " ".join(rng.sample(FILLER, 12))
+           for _ in range(n_jds)]
+    return resumes, jds
+
+
+def load_corpus(path: Path) -> tuple[list[tuple[str, bytes]], list[str]]:
+    resumes = [(p.name, p.read_bytes()) for p in sorted(path.glob("*.pdf"))]
+    jds = [p.read_text(encoding="utf-8") for p in sorted(path.glob("*.txt"))]
+    if not resumes or not jds:
+        raise SystemExit(f"{path} must contain at least one *.pdf resume and one *.txt job description")
+    return resumes, jds
+
+
+def stub_responder(model_name: str, prompt: str) -> str:
+    """Answers like Gemini would for the two prompt shapes the API sends."""
+    if "Keywords:" in prompt and "Resume Content:" not in prompt:
+        return ", ".join(SKILLS[:8])
+    return ('```json\n{"JD Match": "72%", "MissingKeywords": ["Terraform", "Kafka"], '
+            '"Profile Summary": "Benchmark stub response."}\n```')
+
+
+def parse_server_timing(header: str) -> dict[str, float]:
+    timings = {}
+    for part in filter(None, (p.strip() for p in header.split(","))):
+        name, _, duration = part.partition(";dur=")
+        if duration:
+            timings[name] = float(duration) / 1000
+    return timings
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50_ms": round(p50 * 1000, 2), "p95_ms": round(p95 * 1000, 2), "p99_ms": round(p99 * 1000, 2),
+            "mean_ms": round(float(np.mean(values)) * 1000, 2)}
+
+
+def run(args) -> dict:
+    resumes, jds = load_corpus(Path(args.corpus)) if args.corpus else synthetic_corpus(args.resumes, args.jds, args.seed)
+
+    backend = FakeGeminiBackend(stub_responder, latency=args.latency, failure_rate=args.failure_rate)
+    ats_app.set_gemini_client(GeminiClient(backend, requests_per_minute=1e9, tokens_per_minute=1e12,
+                                           backoff_base=args.backoff))
+    if not args.cache:
+        ats_app.result_cache = ResultCache(max_entries=0)  # Every request pays for its Gemini calls
+
+    random.seed(args.seed)  # FakeGeminiBackend draws its failures from the global RNG
+    rng = random.Random(args.seed)
+    plan = [(rng.choice(resumes), rng.choice(jds)) for _ in range(args.requests)]
+    client = ats_app.app.test_client()
+
+    def one(item):
+        (filename, data), jd = item
+        started = time.perf_counter()
+        response = client.post(args.endpoint, data={"job_description": jd, "mode": args.mode,
+                                                    "resume": (io.BytesIO(data), filename)})
+        response.get_data()
+        return time.perf_counter() - started, response.status_code, response.headers.get("Server-Timing", "")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, plan))
+    wall = time.perf_counter() - started
+
+    stages: dict[str, list[float]] = {}
+    for _, _, header in results:
+        for name, seconds in parse_server_timing(header).items():
+            stages.setdefault(name, []).append(seconds)
+
+    return {
+        "requests": len(results),
+        "errors": sum(1 for _, status, _ in results if status >= 400),
+        "concurrency": args.concurrency,
+        "stub_latency_s": args.latency,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(results) / wall, 2) if wall else 0.0,
+        "latency": percentiles([seconds for seconds, _, _ in results]),
+        "stages": {name: percentiles(values) for name, values in sorted(stages.items())},
+        "upstream_calls": backend.calls,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"{report['requests']} requests, {report['errors']} errors, concurrency {report['concurrency']}, "
+          f"stub latency {report['stub_latency_s']}s, {report['upstream_calls']} Gemini calls")
+    print(f"wall {report['wall_s']}s, throughput {report['throughput_rps']} req/s")
+    print(f"{'stage':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in [("request", report["latency"])] + list(report["stages"].items()):
+        print(f"{name:<16}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="Directory of *.pdf resumes and *.txt job descriptions")
+    parser.add_argument("--resumes", type=int, default=20, help="Synthetic resumes to generate")
+    parser.add_argument("--jds", type=int, default=5, help="Synthetic job descriptions to generate")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub Gemini latency per call, seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of stub calls failing with 503")
+    parser.add_argument("--backoff", type=float, default=0.5, help="Retry backoff base, seconds")
+    parser.add_argument("--endpoint", default="/api/analyze")
+    parser.add_argument("--mode", default="llm", choices=sorted(ats_app.ANALYSIS_MODES))
+    parser.add_argument("--cache", action="store_true", help="Keep the result cache enabled")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(os.getenv("ATS_BENCH_LOG_LEVEL", "WARNING"))
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
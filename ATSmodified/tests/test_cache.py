@@ -0,0 +1,19 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+
+from cache import ResultCache  # noqa: E402
+
+
+def test_disk_hit_keeps_stored_expiry(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    ResultCache(ttl_seconds=60, db_path=db_path).set("key", {"value": 1})
+
+    cache = ResultCache(ttl_seconds=60, db_path=db_path)
+    cache.ttl_seconds = 3600  # A fresh TTL on promotion would show up as a later expiry
+    assert cache.get("key") == {"value": 1}
+    assert cache.stats()["disk_hits"] == 1
+
+    stored_expires_at, _ = cache._disk_get("key", 0)
+    assert cache._entries["key"][0] == stored_expires_at
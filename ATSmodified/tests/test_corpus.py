@@ -0,0 +1,31 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+
+from corpus import ResumeCorpus  # noqa: E402
+
+KEYWORDS = "Python, Django, AWS, GCP, Kubernetes"
+
+
+def test_search_matches_slash_joined_and_hyphenated_skills(tmp_path):
+    corpus = ResumeCorpus(str(tmp_path / "corpus.db"))
+    corpus.add("full.pdf", b"full", "Built Python/Django services on AWS/GCP, k8s-based deployments")
+    corpus.add("partial.pdf", b"partial", "Python scripting")
+
+    hits = corpus.search(KEYWORDS)
+
+    assert [hit["filename"] for hit in hits] == ["full.pdf", "partial.pdf"]
+    assert hits[0]["MissingKeywords"] == []
+
+
+def test_outdated_index_is_rebuilt_on_open(tmp_path):
+    db_path = str(tmp_path / "corpus.db")
+    ResumeCorpus(db_path).add("full.pdf", b"full", "Python/Django on AWS/GCP, k8s-based")
+    with sqlite3.connect(db_path) as conn:  # Postings as the old tokenizer wrote them
+        conn.execute("DELETE FROM postings")
+        conn.execute("INSERT INTO postings (term, resume_id, tf) VALUES ('python/django', 1, 1)")
+        conn.execute("PRAGMA user_version = 0")
+
+    assert ResumeCorpus(db_path).search(KEYWORDS)[0]["JD Match"] == "100%"
@@ -0,0 +1,68 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+
+from gemini_client import CircuitBreaker, FakeGeminiBackend, GeminiClient, GeminiStreamError  # noqa: E402
+
+
+def blocked_response(model_name, prompt):
+    raise ValueError("response.text is not available: the candidate was blocked")
+
+
+def half_open_client(responder, **kwargs) -> GeminiClient:
+    """A client whose breaker has opened and waited out its reset timeout."""
+    client = GeminiClient(FakeGeminiBackend(responder), failure_threshold=1, reset_timeout=0.01,
+                          backoff_base=0, **kwargs)
+    client.breaker.record_failure()
+    time.sleep(0.02)
+    return client
+
+
+def test_non_retryable_error_releases_half_open_probe():
+    client = half_open_client(blocked_response)
+
+    assert client.generate("prompt", "model").startswith("Error: Gemini API error")
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+
+    client.backend.responder = lambda model_name, prompt: "ok"
+    assert client.generate("prompt", "model") == "ok"
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_throttled_call_releases_half_open_probe():
+    client = half_open_client(lambda model_name, prompt: "ok", requests_per_minute=1, max_wait=0)
+    client.request_bucket.reserve(1, max_wait=0)  # Drain the only request token
+
+    assert "rate limit" in client.generate("prompt", "model")
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+
+    client.request_bucket.refund(1)
+    assert client.generate("prompt", "model") == "ok"
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_stream_non_retryable_error_releases_half_open_probe():
+    client = half_open_client(blocked_response)
+
+    with pytest.raises(GeminiStreamError):
+        list(client.generate_stream("prompt", "model"))
+
+    client.backend.responder = lambda model_name, prompt: "ok"
+    assert "".join(client.generate_stream("prompt", "model")) == "ok"
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_stream_throttled_call_releases_half_open_probe():
+    client = half_open_client(lambda model_name, prompt: "ok", requests_per_minute=1, max_wait=0)
+    client.request_bucket.reserve(1, max_wait=0)
+
+    with pytest.raises(GeminiStreamError, match="rate limit"):
+        list(client.generate_stream("prompt", "model"))
+
+    client.request_bucket.refund(1)
+    assert "".join(client.generate_stream("prompt", "model")) == "ok"
+    assert client.breaker.state == CircuitBreaker.CLOSED
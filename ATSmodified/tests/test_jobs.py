@@ -0,0 +1,46 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+
+from jobs import JobQueue, JobStore  # noqa: E402
+
+
+def test_stale_rows_fail_only_when_another_process_owned_them(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    store = JobStore(db_path, stale_after=0)
+    store.create("mine")
+    store.create("next")  # Runs the stale sweep; this process still owns "mine"
+    assert store.get("mine")["status"] == "queued"
+
+    restarted = JobStore(db_path, stale_after=0)
+    assert restarted.get("mine")["status"] == "failed"
+    assert restarted.get("mine")["error"].startswith("Error: Job was lost")
+
+
+def test_worker_skips_jobs_that_are_no_longer_queued(tmp_path):
+    calls = []
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job_queue = JobQueue(store, lambda payload: calls.append(payload) or ({}, {}), workers=1)
+    store.create("lost")
+    store.update("lost", "failed", error="Error: Job was lost")
+
+    job_queue._queue.put(("lost", {"resume": 1}))
+    job_queue._ensure_workers()
+    job_queue._queue.join()
+
+    assert calls == []
+    assert store.get("lost")["status"] == "failed"
+
+
+def test_tables_from_before_meta_and_owner_are_upgraded(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, result TEXT, error TEXT, "
+                     "created_at REAL NOT NULL, updated_at REAL NOT NULL, expires_at REAL NOT NULL)")
+
+    store = JobStore(db_path)
+    store.create("job")
+    store.update("job", "done", result={"JD Match": "70%"}, meta={"mode": "fast"})
+    assert store.get("job")["mode"] == "fast"
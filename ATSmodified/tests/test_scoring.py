@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+
+from scoring import fast_score, match_percentage, tokenize  # noqa: E402
+
+
+def test_jd_match_is_keyword_coverage():
+    keywords = "Python, Go, AWS, Kubernetes, Docker, SQL"
+
+    assert match_percentage(fast_score("Python developer, Python since 2015", keywords)) == 17
+    assert match_percentage(fast_score("Python, golang and k8s on AWS", keywords)) == 67
+
+
+def test_slash_joined_skills_match_separate_keywords():
+    resume = "Skills: Python/Django, AWS/GCP, React/Redux, CI/CD, k8s, .NET, ML"
+    keywords = "Python, Django, AWS, GCP, React, Kubernetes, .NET, Machine Learning (ML), CI/CD"
+
+    assert fast_score(resume, keywords)["MissingKeywords"] == []
+
+
+def test_hyphenated_skills_split_but_protected_spellings_stay_whole():
+    assert tokenize("k8s-based Go-powered services") == ["kubernetes", "based", "go", "powered", "services"]
+    assert tokenize("CI/CD-pipelines, scikit-learn, node.js, C++/C#") == [
+        "ci/cd", "pipelines", "scikit-learn", "node.js", "c++", "c#"]
@@ -0,0 +1,58 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+
+from stream_parser import IncrementalJSONObjectParser  # noqa: E402
+
+REPLY = ('```json\n{"JD Match": "70%", "MissingKeywords": ["C++, C#", "a [b]", "Go"], '
+         '"Profile Summary": "Led {infra}, \\"SRE\\", and more."}\n```\nHope this helps!')
+EXPECTED = {"JD Match": "70%", "MissingKeywords": ["C++, C#", "a [b]", "Go"],
+            "Profile Summary": 'Led {infra}, "SRE", and more.'}
+
+
+def feed_in_chunks(text: str, size: int) -> tuple[IncrementalJSONObjectParser, list]:
+    parser = IncrementalJSONObjectParser()
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return parser, events
+
+
+def test_any_chunk_size_gives_the_same_events_and_result():
+    for size in (1, 2, 3, 7, 16, len(REPLY)):
+        parser, events = feed_in_chunks(REPLY, size)
+        assert parser.result() == EXPECTED, size
+        assert events == [
+            ("field", "JD Match", "70%"),
+            ("item", "MissingKeywords", "C++, C#"),
+            ("item", "MissingKeywords", "a [b]"),
+            ("item", "MissingKeywords", "Go"),
+            ("field", "Profile Summary", 'Led {infra}, "SRE", and more.'),
+        ], size
+
+
+def test_text_after_the_object_is_ignored():
+    parser, _ = feed_in_chunks(REPLY + ' {"JD Match": "1%"}', 5)
+    assert parser.result() == EXPECTED
+
+
+def test_result_is_none_until_the_object_closes():
+    parser, _ = feed_in_chunks(REPLY[:REPLY.index('"Profile')], 4)
+    assert parser.result() is None
+
+
+def test_undecodable_value_fails_the_whole_result():
+    reply = '{"JD Match": "70%", "MissingKeywords": ["Go"], "Profile Summary": "line one\nline two"}'
+    parser, events = feed_in_chunks(reply, 8)
+
+    assert parser.failed
+    assert parser.result() is None
+    assert ("field", "JD Match", "70%") in events
+    assert not any(name == "Profile Summary" for _, name, _ in events)
+
+
+def test_null_values_are_kept():
+    parser, _ = feed_in_chunks(json.dumps({"JD Match": None, "MissingKeywords": []}), 3)
+    assert parser.result() == {"JD Match": None, "MissingKeywords": []}
@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+
+from gemini_client import estimate_tokens  # noqa: E402
+from text_compaction import fit_to_budget, strip_repeated_margins  # noqa: E402
+
+
+def test_repeated_header_kept_on_first_page_only():
+    header = "Jane Doe | jane@example.com | +1 555 0100"
+    pages = [[(0.02, 0.05, header), (0.3, 0.4, f"Body {i}"), (0.95, 0.98, f"Page {i + 1}")] for i in range(3)]
+
+    assert strip_repeated_margins(pages) == [[header, "Body 0"], ["Body 1"], ["Body 2"]]
+
+
+RESUME = "\n".join([
+    "Experience",
+    "- Built payment services handling 2M requests per day " * 3,
+    "Languages",
+    "Python, Java, Go, TypeScript",
+    "Certifications",
+    "AWS Certified Solutions Architect",
+    "Hobbies",
+    "- Chess, hiking and long-distance cycling " * 3,
+    "Research Experience",
+    "- Distributed consensus under partial network failure",
+    "References",
+    "- Available on request from previous managers and colleagues " * 3,
+])
+
+
+def test_fit_to_budget_drops_low_value_sections_in_order():
+    without_references = RESUME[:RESUME.index("\nReferences")]
+    fitted = fit_to_budget(RESUME, estimate_tokens(without_references))
+
+    assert fitted == without_references
+
+    fitted = fit_to_budget(RESUME, estimate_tokens(without_references) - 10)
+    assert "References" not in fitted and "Hobbies" not in fitted
+    for kept in ("Python, Java, Go", "AWS Certified", "Research Experience", "Distributed consensus"):
+        assert kept in fitted